@@ -23,6 +23,7 @@ setup(
     package_dir={"": "src"},
     package_data={},
     install_requires=[
+        "fiona==1.*,>=1.8.13",
         "folium==0.*,>=0.10.1",
         "geopandas==0.*,>=0.6.2",
         "pandas==0.*,>=0.25.3",
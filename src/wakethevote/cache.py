@@ -0,0 +1,210 @@
+import glob
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+from .logger import logger
+from .paths import STATES_DATA_PATH
+
+__all__ = ("Artifact", "list_artifacts", "record", "touch", "enforce_budget")
+
+# Everything under this folder is tracked; the manifest lives at its root
+CACHE_ROOT = STATES_DATA_PATH
+MANIFEST_NAME = "cache.json"
+
+# Final outputs that are never evicted: org units, their README and exports
+PROTECTED_PATTERNS = ("*_orgunits", "README", "*_shapes")
+# Intermediate files that can be rebuilt from the Census sources
+REGENERABLE_PATTERNS = (
+    "census/*",
+    "*_blocks",
+    "*_adjacency",
+    "*_preview",
+)
+
+Artifact = NamedTuple(
+    "Artifact",
+    [
+        ("key", str),
+        ("size", int),
+        ("last_used", float),
+        ("provenance", str),
+        ("protected", bool),
+    ],
+)
+
+# Suffixes stripped from file names to find the artifact they belong to; names
+# themselves may contain dots (e.g. "Ste. Genevieve")
+ARTIFACT_SUFFIXES = (
+    ".shp",
+    ".dbf",
+    ".shx",
+    ".prj",
+    ".cpg",
+    ".txt",
+    ".csv",
+    ".html",
+    ".json",
+    ".zip",
+    ".part",
+)
+
+_lock = threading.Lock()
+
+
+def artifact_key(path: Path) -> Optional[str]:
+    """
+    Name of the artifact a file belongs to, relative to the cache root, or None
+    if the path is outside it. A shapefile and its sidecar files (.dbf, .prj,
+    metadata .txt...) share the name of the file without its suffix; the
+    per-county block files split from a state form a single artifact.
+    """
+    try:
+        relative = Path(path).resolve().relative_to(CACHE_ROOT.resolve())
+    except ValueError:
+        return None
+
+    parts = relative.parts
+    if len(parts) >= 3 and parts[1] == "census" and parts[2].startswith("blocks"):
+        return "/".join(parts[:3])
+    name = relative.name
+    while name.endswith(ARTIFACT_SUFFIXES):
+        name = name[: name.rindex(".")]
+    return relative.with_name(name).as_posix()
+
+
+def record(path: Path, provenance: str) -> None:
+    """Note that an artifact was just created from `provenance`"""
+    key = artifact_key(path)
+    if key is None:
+        return
+    with _lock:
+        manifest = _read_manifest()
+        manifest[key] = {"last_used": time.time(), "provenance": provenance}
+        _write_manifest(manifest)
+
+
+def touch(*paths: Path) -> None:
+    """
+    Note that artifacts were just used; pass several paths at once to update
+    the manifest only once
+    """
+    keys = [key for key in map(artifact_key, paths) if key is not None]
+    if not keys:
+        return
+    with _lock:
+        manifest = _read_manifest()
+        now = time.time()
+        for key in keys:
+            manifest.setdefault(key, {"provenance": "unknown"})["last_used"] = now
+        _write_manifest(manifest)
+
+
+def list_artifacts() -> List[Artifact]:
+    """
+    Every artifact under the cache root with its size on disk, oldest use first.
+    Files created before tracking started use their modification time.
+    """
+    manifest = _read_manifest()
+
+    sizes: Dict[str, int] = {}
+    modified: Dict[str, float] = {}
+    for dirpath, _, filenames in os.walk(CACHE_ROOT):
+        for filename in filenames:
+            path = Path(dirpath) / filename
+            if path.parent == CACHE_ROOT and filename.startswith((MANIFEST_NAME, ".")):
+                continue
+            key = artifact_key(path)
+            stat = path.stat()
+            sizes[key] = sizes.get(key, 0) + stat.st_size
+            modified[key] = max(modified.get(key, 0), stat.st_mtime)
+
+    artifacts = [
+        Artifact(
+            key=key,
+            size=size,
+            last_used=manifest.get(key, {}).get("last_used", modified[key]),
+            provenance=manifest.get(key, {}).get("provenance", "unknown"),
+            protected=is_protected(key),
+        )
+        for key, size in sizes.items()
+    ]
+    return sorted(artifacts, key=lambda artifact: artifact.last_used)
+
+
+def is_protected(key: str) -> bool:
+    """
+    Whether an artifact is a final output (or unrecognized) and so must never
+    be evicted
+    """
+    path = Path(key)
+    if any(path.match(pattern) for pattern in PROTECTED_PATTERNS):
+        return True
+    return not any(path.match(pattern) for pattern in REGENERABLE_PATTERNS)
+
+
+def enforce_budget(max_size: int, dry_run: bool = False) -> List[Artifact]:
+    """
+    Delete the least recently used regenerable artifacts until the cache fits
+    in `max_size` bytes
+
+    Returns:
+        the artifacts that were (or, with `dry_run`, would be) deleted
+    """
+    artifacts = list_artifacts()
+    total = sum(artifact.size for artifact in artifacts)
+
+    evicted = []
+    for artifact in artifacts:
+        if total <= max_size:
+            break
+        if artifact.protected:
+            continue
+        logger.info(f" - Evicting {artifact.key} ({artifact.size:,} bytes)")
+        if not dry_run:
+            remove(artifact.key)
+        evicted.append(artifact)
+        total -= artifact.size
+
+    if total > max_size:
+        logger.warning(
+            f"Cache is {total:,} bytes after eviction; the rest is protected output"
+        )
+    return evicted
+
+
+def remove(key: str) -> None:
+    """Delete every file of an artifact and forget it"""
+    path = CACHE_ROOT / key
+    if path.is_dir():
+        shutil.rmtree(path)
+    else:
+        for file in path.parent.glob(f"{glob.escape(path.name)}.*"):
+            if artifact_key(file) == key:
+                file.unlink()
+
+    with _lock:
+        manifest = _read_manifest()
+        manifest.pop(key, None)
+        _write_manifest(manifest)
+
+
+def _read_manifest() -> Dict[str, dict]:
+    try:
+        with open(CACHE_ROOT / MANIFEST_NAME) as manifest_file:
+            return json.load(manifest_file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _write_manifest(manifest: Dict[str, dict]) -> None:
+    # Write to a temporary file first so readers never see a partial manifest
+    manifest_path = CACHE_ROOT / MANIFEST_NAME
+    partial_path = manifest_path.with_name(MANIFEST_NAME + ".partial")
+    with open(partial_path, "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+    os.replace(partial_path, manifest_path)
@@ -1,10 +1,16 @@
 import os
+import shutil
+from collections import defaultdict
 from datetime import datetime
+from pathlib import Path
+from typing import Iterator, List
 
+import fiona
 import geopandas as gpd
 import pandas as pd
 import requests
 
+from . import cache
 from .logger import logger
 from .paths import get_census_data_path, get_county_data_path
 from .types import County, CountyFips, StateFips
@@ -19,8 +25,29 @@ except ModuleNotFoundError:
 else:
     load_dotenv(find_dotenv())
 
+# URL for the statewide 2010 block features with population & housing counts
+STATE_BLOCKS_URL = "https://www2.census.gov/geo/tiger/TIGER2010BLKPOPHU/tabblock2010_{state_fips}_pophu.zip"
+# Census API for the block level race data joined to the block features
+CENSUS_API_URL = "https://api.census.gov/data/2010/dec/sf1"
 
-def load_census_block_data(county: County) -> gpd.GeoDataFrame:
+# Rough in-memory footprint of a single block feature (coordinates, attributes
+# and Python object overhead), used to turn a memory budget into a chunk size
+BYTES_PER_BLOCK = 16 * 1024
+DEFAULT_CHUNK_SIZE = 10_000
+
+
+def chunk_size_for_memory(max_memory: int) -> int:
+    """Number of block features to read at a time for a memory budget in bytes
+
+    Only a quarter of the budget goes to the read buffer; the rest is left for
+    the county being processed, which is held in memory in full.
+    """
+    return max(1, max_memory // 4 // BYTES_PER_BLOCK)
+
+
+def load_census_block_data(
+    county: County, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> gpd.GeoDataFrame:
     """Imports census block features for the supplied county FIPS code
 
     Description:
@@ -31,10 +58,14 @@ def load_census_block_data(county: County) -> gpd.GeoDataFrame:
 
         Census feature data are from 'https://www2.census.gov/geo/tiger/'.
 
+        The statewide features are never loaded at once: on first use they are
+        streamed in chunks of `chunk_size` features and split into one
+        shapefile per county, so peak memory depends on the largest county
+        rather than the largest state.
+
     Args:
         county(tuple): County
-        state_path(str): path to statewide data
-        county_path(str): path to county specific data
+        chunk_size(int): number of block features to read at a time
 
     Returns:
         Geodataframe of census blocks for the county with race data
@@ -52,33 +83,44 @@ def load_census_block_data(county: County) -> gpd.GeoDataFrame:
     # See if the data have already been pulled; if so, read into dataframe and return
     if os.path.exists(county_block_file):
         logger.info(f" Census data loaded from {county_block_file}")
+        cache.touch(county_block_file)
         return gpd.read_file(county_block_file)
 
     logger.debug(f" Failed to load data from {county_block_file}")
 
     # URL for Census data if we need it
-    url = f"https://www2.census.gov/geo/tiger/TIGER2010BLKPOPHU/tabblock2010_{state_fips}_pophu.zip"
+    url = STATE_BLOCKS_URL.format(state_fips=state_fips)
 
-    # See if the statewide block shapefile has been downloaded
+    # See if the statewide blocks have already been split into counties
     census_path = get_census_data_path(county.state)
-
-    state_blocks_file = census_path / "StateBlocks.shp"
-    if os.path.exists(state_blocks_file):
-        logger.debug(f"  - Loading blocks from {state_blocks_file}")
-        state_blocks = gpd.read_file(state_blocks_file)
-
-    # Pull the state block data for the supplied FIPS code
-    else:
-        logger.info(
-            f" - Downloading blocks for state FIPS {state_fips} to "
-            f"{state_blocks_file}; this take a few minutes..."
-        )
-        state_blocks = gpd.read_file(url)
-        state_blocks.to_file(state_blocks_file)
+    partition_path = census_path / "blocks"
+    if not partition_path.exists():
+        # Older downloads kept a full copy of the state as StateBlocks.shp
+        state_blocks_file = census_path / "StateBlocks.shp"
+        if state_blocks_file.exists():
+            logger.debug(f"  - Loading blocks from {state_blocks_file}")
+            source = str(state_blocks_file)
+        else:
+            logger.info(
+                f" - Downloading blocks for state FIPS {state_fips} to "
+                f"{census_path}; this take a few minutes..."
+            )
+            source = f"zip://{download_state_blocks(url, census_path)}"
+
+        logger.debug(f"  - Splitting state blocks into counties in {partition_path}")
+        partition_state_blocks(source, partition_path, chunk_size)
 
     # Subset county blocks
     logger.debug(f"  - Subsetting data for County FIPS {county_fips}")
-    county_blocks = state_blocks[state_blocks.COUNTYFP10 == county_fips]
+    county_blocks_file = partition_path / f"{county_fips}.shp"
+    if not county_blocks_file.exists():
+        # Raised like other failures to get Census data, so callers skip the
+        # county with a warning instead of stopping
+        raise requests.exceptions.RequestException(
+            f"No census blocks found for County FIPS {county.fips}"
+        )
+    cache.touch(partition_path)
+    county_blocks = gpd.read_file(county_blocks_file)
 
     # Retrieve block attribute data
     logger.debug("  - Fetching block attribute data")
@@ -132,9 +174,99 @@ def load_census_block_data(county: County) -> gpd.GeoDataFrame:
             "[BlackHH] computed as [HOUSING10] * [PctBlack]), rounded to the nearest integer"
         )
 
+    cache.record(county_block_file, f"{url} joined with {CENSUS_API_URL}")
+
     return county_blocks
 
 
+def download_state_blocks(url: str, census_path: Path) -> Path:
+    """Streams the zipped statewide block shapefile to the census folder
+
+    Args:
+        url(str): URL of the zipped TIGER block shapefile
+        census_path(Path): path to statewide data
+
+    Returns:
+        path to the downloaded zip file
+    """
+    zip_file = census_path / url.rsplit("/", 1)[-1]
+    if zip_file.exists():
+        cache.touch(zip_file)
+        return zip_file
+
+    # Download to a temporary name so an interrupted transfer is never reused
+    partial_file = zip_file.with_name(zip_file.name + ".part")
+    with requests.get(url, stream=True) as response:
+        response.raise_for_status()
+        with open(partial_file, "wb") as out_zip:
+            for data in response.iter_content(chunk_size=1024 * 1024):
+                out_zip.write(data)
+    partial_file.rename(zip_file)
+    cache.record(zip_file, url)
+
+    return zip_file
+
+
+def iter_block_chunks(
+    collection: fiona.Collection, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[List[dict]]:
+    """Yields the features of an open collection in lists of `chunk_size`
+
+    Args:
+        collection(fiona.Collection): open block feature collection
+        chunk_size(int): maximum number of features per chunk
+    """
+    chunk: List[dict] = []
+    for feature in collection:
+        chunk.append(feature)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def partition_state_blocks(
+    source: str, partition_path: Path, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> None:
+    """Splits statewide block features into one shapefile per county
+
+    Description:
+        Streams the features of `source` in chunks and appends each chunk to
+        `{partition_path}/{COUNTYFP10}.shp`, so at most one chunk is held in
+        memory. The files are written to a staging folder that is renamed
+        once complete, so an interrupted run is never mistaken for a
+        finished one.
+
+    Args:
+        source(str): path (or fiona URI, e.g. 'zip://...') of the state blocks
+        partition_path(Path): folder to write the county shapefiles to
+        chunk_size(int): number of features to read at a time
+    """
+    staging_path = partition_path.with_name(partition_path.name + ".partial")
+    if staging_path.exists():
+        shutil.rmtree(staging_path)
+    staging_path.mkdir(parents=True)
+
+    with fiona.open(source) as collection:
+        meta = dict(
+            driver="ESRI Shapefile", schema=collection.schema, crs=collection.crs
+        )
+        for chunk in iter_block_chunks(collection, chunk_size):
+            county_features = defaultdict(list)
+            for feature in chunk:
+                county_features[feature["properties"]["COUNTYFP10"]].append(feature)
+
+            for county_fips, features in county_features.items():
+                county_file = staging_path / f"{county_fips}.shp"
+                mode = "a" if county_file.exists() else "w"
+                with fiona.open(county_file, mode, **meta) as county_sink:
+                    county_sink.writerecords(features)
+
+    staging_path.rename(partition_path)
+    cache.record(partition_path, f"split from {source}")
+
+
 def get_block_attributes(
     state_fips: StateFips, county_fips: CountyFips, api_key: str
 ) -> gpd.GeoDataFrame:
@@ -156,7 +288,7 @@ def get_block_attributes(
         geodataframe of census blocks for the county
     """
     # Census API call to get the data for the provided state/county
-    url = "https://api.census.gov/data/2010/dec/sf1"
+    url = CENSUS_API_URL
     params = {
         "get": "P003001,P003003,P010001,P010004",
         "for": "block:*",
@@ -1,22 +1,130 @@
 import argparse
+import json
 import logging
+import os
+import re
 import sys
+from collections import defaultdict
+from datetime import datetime
 from itertools import chain
+from typing import List, Optional
 
+from . import cache
+from .census import DEFAULT_CHUNK_SIZE, chunk_size_for_memory
 from .counties import find_counties
-from .download import download_county
-from .export import export_counties
+from .download import download_county, download_state
+from .export import export_counties, export_geopackage
 from .logger import logger
 from .preview import preview_county
+from .stats import get_stats, summarize_states
+
+SIZE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+
+def positive_int(text: str) -> int:
+    """Parse a whole number of at least 1, e.g. a number of workers"""
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid number: {text!r}")
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1: {text!r}")
+    return value
+
+
+def parse_size(text: str) -> int:
+    """Parse a human readable size such as '512M' or '2G' into bytes"""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMGT]?)B?\s*", text.upper())
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid size: {text!r}")
+    number, unit = match.groups()
+    return int(float(number) * SIZE_UNITS[unit])
+
+
+def format_size(size: float) -> str:
+    """Format a number of bytes as a human readable size such as '1.5G'"""
+    for unit in ("", "K", "M", "G"):
+        if size < 1024:
+            break
+        size /= 1024
+    else:
+        unit = "T"
+    return f"{size:.1f}{unit}" if unit else f"{size:.0f}"
+
+
+def get_cache_budget(max_size: Optional[int] = None) -> Optional[int]:
+    """Cache size budget in bytes from --max-size or WAKEVOTE_CACHE_SIZE"""
+    if max_size is not None:
+        return max_size
+    env_size = os.getenv("WAKEVOTE_CACHE_SIZE")
+    return parse_size(env_size) if env_size else None
+
+
+def cache_main(argv: List[str]) -> None:
+    """
+    Manage the downloaded and generated files in data/states,
+    try `$ wakevote cache --help`
+    """
+    parser = argparse.ArgumentParser(
+        "wakevote cache",
+        description="List or prune cached data. Org unit outputs are never deleted.",
+    )
+    parser.add_argument(
+        "action",
+        choices=("list", "prune"),
+        nargs="?",
+        default="list",
+        help="'list' shows each cached artifact; 'prune' evicts the least "
+        "recently used regenerable artifacts until the cache fits the budget",
+    )
+    parser.add_argument(
+        "--max-size",
+        type=parse_size,
+        help="Size budget, e.g. 20G; defaults to the WAKEVOTE_CACHE_SIZE variable",
+    )
+    parser.add_argument(
+        "--dry-run",
+        help="With prune, only show what would be deleted",
+        action="store_true",
+    )
+    args = parser.parse_args(argv)
+
+    if args.action == "list":
+        artifacts = cache.list_artifacts()
+        for artifact in artifacts:
+            print(
+                f"{format_size(artifact.size):>7}  "
+                f"{datetime.fromtimestamp(artifact.last_used):%Y-%m-%d %H:%M}  "
+                f"{'protected' if artifact.protected else 'regenerable':<11}  "
+                f"{artifact.key}  ({artifact.provenance})"
+            )
+        total = sum(artifact.size for artifact in artifacts)
+        regenerable = sum(a.size for a in artifacts if not a.protected)
+        print(f"{format_size(total)} total, {format_size(regenerable)} regenerable")
+
+    elif args.action == "prune":
+        budget = get_cache_budget(args.max_size)
+        if budget is None:
+            sys.exit(
+                f"{parser.prog}: error: set a budget with --max-size or WAKEVOTE_CACHE_SIZE"
+            )
+        evicted = cache.enforce_budget(budget, dry_run=args.dry_run)
+        freed = format_size(sum(artifact.size for artifact in evicted))
+        verb = "Would free" if args.dry_run else "Freed"
+        print(f"{verb} {freed} from {len(evicted)} artifacts")
 
 
 def main() -> None:
     """
     Command line interface for this repo, try `$ wakevote --help` after install
     """
+    if sys.argv[1:2] == ["cache"]:
+        return cache_main(sys.argv[2:])
+
     parser = argparse.ArgumentParser(
         "WakeVoter",
-        description="Must include one of the following: --download, --preview, or --export",
+        description="Must include one of the following: --download, --preview, --export, or --stats",
+        epilog="Use `wakevote cache` to list or prune cached data",
     )
     parser.add_argument(
         "selections", nargs="+", type=str, help="One or more US States or Counties",
@@ -31,7 +139,7 @@ def main() -> None:
         nargs="?",
     )
 
-    # Must choose one of these three options
+    # Must choose one of these four options
     parser.add_argument(
         "--download", help="Download county level data", action="store_true"
     )
@@ -43,29 +151,117 @@ def main() -> None:
         help="Export all data for a state as a GeoJSON file",
         action="store_true",
     )
+    parser.add_argument(
+        "--stats",
+        help="Print org unit counts and coverage without building org unit shapes",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--format",
+        choices=("geojson", "gpkg"),
+        default="geojson",
+        help="Export format: a GeoJSON file per state, or layers in data/org_units.gpkg",
+    )
+    parser.add_argument(
+        "--national",
+        help="With --format gpkg, export all states to a single layer",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--stats-format",
+        choices=("csv", "json"),
+        default="csv",
+        help="Format of the --stats output, written to stdout",
+    )
+    parser.add_argument(
+        "--by-state",
+        help="With --stats, total the counties of each state",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--max-memory",
+        type=parse_size,
+        help="Memory budget for reading statewide block data, e.g. 512M or 2G",
+    )
+
+    parser.add_argument(
+        "--state-scope",
+        help="With --download, cluster each state in one pass so org units can cross county lines",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--workers",
+        type=positive_int,
+        default=1,
+        help="Number of processes used for clustering (default 1)",
+    )
+    parser.add_argument(
+        "--export-workers",
+        type=positive_int,
+        default=1,
+        help="Number of processes used to read and write files with --export "
+        "(default 1)",
+    )
 
     args = parser.parse_args()
     logger.setLevel(args.loglevel)
 
-    mutually_exclusive_required_args = (args.download, args.preview, args.export)
+    mutually_exclusive_required_args = (
+        args.download,
+        args.preview,
+        args.export,
+        args.stats,
+    )
     if len([arg for arg in mutually_exclusive_required_args if arg]) != 1:
         sys.exit(
             f"{parser.prog}: error: you must choose one (and only one) of the "
-            "following flags --download, --preview, or --export"
+            "following flags --download, --preview, --export, or --stats"
         )
 
+    chunk_size = (
+        chunk_size_for_memory(args.max_memory) if args.max_memory else DEFAULT_CHUNK_SIZE
+    )
+
     counties = chain.from_iterable(find_counties(s) for s in args.selections)
 
     if args.preview:
         for county in counties:
             preview_county(county)
 
+    elif args.download and args.state_scope:
+        states = defaultdict(list)
+        for county in counties:
+            states[county.state].append(county)
+        for state_counties in states.values():
+            download_state(state_counties, chunk_size, args.workers)
+
     elif args.download:
         for county in counties:
-            download_county(county)
+            download_county(county, chunk_size, args.workers)
+
+    elif args.stats:
+        stats = get_stats(counties, chunk_size)
+        if args.by_state:
+            stats = summarize_states(stats)
+        if args.stats_format == "json":
+            # DataFrame.to_json only takes an indent from pandas 1.0 on
+            records = json.loads(stats.to_json(orient="records"))
+            json.dump(records, sys.stdout, indent=2)
+        else:
+            stats.to_csv(sys.stdout, index=False)
+
+    elif args.export and args.format == "gpkg":
+        export_geopackage(counties, national=args.national, workers=args.export_workers)
 
     elif args.export:
-        export_counties(counties)
+        export_counties(counties, workers=args.export_workers)
+
+    # Downloads are what grow the data folder, so keep it within budget after them
+    budget = get_cache_budget()
+    if args.download and budget is not None:
+        logger.info("Enforcing the data cache size budget")
+        cache.enforce_budget(budget)
 
 
 if __name__ == "__main__":
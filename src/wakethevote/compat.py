@@ -0,0 +1,32 @@
+import inspect
+from typing import List
+
+import geopandas as gpd
+from shapely.geometry.base import BaseGeometry
+
+__all__ = ("sjoin", "parts")
+
+# geopandas 0.10 renamed the `op` argument of sjoin to `predicate`, and 1.0
+# removed `op`; pass the spatial predicate under whichever name is supported
+_SJOIN_PREDICATE = (
+    "predicate" if "predicate" in inspect.signature(gpd.sjoin).parameters else "op"
+)
+
+
+def sjoin(
+    left: gpd.GeoDataFrame,
+    right: gpd.GeoDataFrame,
+    how: str = "inner",
+    predicate: str = "intersects",
+) -> gpd.GeoDataFrame:
+    """Spatial join of two GeoDataFrames on any geopandas release"""
+    return gpd.sjoin(left, right, how=how, **{_SJOIN_PREDICATE: predicate})
+
+
+def parts(geometry: BaseGeometry) -> List[BaseGeometry]:
+    """
+    The polygons of a Polygon or MultiPolygon; multi-part geometries can only
+    be iterated through `geoms` from shapely 2 on, and a single Polygon (e.g.
+    a union of adjacent blocks) has no parts to iterate
+    """
+    return list(getattr(geometry, "geoms", [geometry]))
@@ -1,27 +1,98 @@
+import glob
+from typing import Dict, List
+
+import geopandas as gpd
+import pandas as pd
 import requests
 
-from .census import load_census_block_data
+from . import cache
+from .census import DEFAULT_CHUNK_SIZE, load_census_block_data
 from .logger import logger
-from .org_units import get_org_units
+from .org_units import SHAPEFILE_COLUMNS, get_org_units
 from .paths import get_county_data_path
 from .types import County
 
 
-def download_county(county: County) -> None:
+def download_county(
+    county: County, chunk_size: int = DEFAULT_CHUNK_SIZE, workers: int = 1
+) -> None:
     logger.info(
         f"*** Downloading data for {county.name} {county.state} ({county.fips}) ***"
     )
 
     logger.info("Loading Census block data")
     try:
-        blocks = load_census_block_data(county)
+        blocks = load_census_block_data(county, chunk_size)
     except requests.exceptions.RequestException as e:
         logger.warning(e)
         return
 
     logger.info("Clustering into org units")
-    blocks = get_org_units(blocks)
+    blocks = get_org_units(blocks, workers)
+
+    save_org_units(county, blocks)
+
+
+def download_state(
+    counties: List[County], chunk_size: int = DEFAULT_CHUNK_SIZE, workers: int = 1
+) -> None:
+    """
+    Cluster all the given counties of a state in one pass, so org units can
+    cross county lines, then save each county's share of the org units. An org
+    unit that straddles a county line is saved once, with the first county
+    listed in its 'Counties' field; a county left with no org units of its own
+    has any it saved before removed.
+    """
+    state = counties[0].state
+    logger.info(f"*** Downloading data for {state} ({len(counties)} counties) ***")
+
+    logger.info("Loading Census block data")
+    county_blocks = {}
+    for county in counties:
+        try:
+            blocks = load_census_block_data(county, chunk_size)
+        except requests.exceptions.RequestException as e:
+            logger.warning(e)
+            continue
+        # Only majority black blocks can be part of an org unit; dropping the
+        # rest right away keeps peak memory near that of the largest county
+        county_blocks[county] = blocks.query("PctBlack >= 50")
+
+    logger.info(f"Clustering {state} into org units")
+    for county, org_units in get_state_org_units(county_blocks, workers).items():
+        save_org_units(county, org_units)
+
 
+def get_state_org_units(
+    county_blocks: Dict[County, gpd.GeoDataFrame], workers: int = 1
+) -> Dict[County, gpd.GeoDataFrame]:
+    """
+    Cluster the blocks of several counties together and split the resulting
+    org units back out by county. Each org unit belongs to exactly one county,
+    the first (lowest FIPS) of the counties it covers, so exports that combine
+    counties never count it twice.
+    """
+    if not county_blocks:
+        return {}
+
+    # Only majority black blocks can be part of an org unit
+    state_blocks = [blocks.query("PctBlack >= 50") for blocks in county_blocks.values()]
+    blocks = pd.concat(state_blocks, ignore_index=True).pipe(
+        gpd.GeoDataFrame, crs=state_blocks[0].crs
+    )
+    org_units = get_org_units(blocks, workers)
+
+    if org_units.empty:
+        return {county: org_units for county in county_blocks}
+    owning_county = org_units.Counties.str.split(",").str[0]
+    return {county: org_units[owning_county == county.fips] for county in county_blocks}
+
+
+def save_org_units(county: County, blocks: gpd.GeoDataFrame) -> None:
+    """
+    Write a county's org units as a shapefile and CSV, with a README; if there
+    are none, delete any the county had saved before
+    """
     # Write output
     county_path = get_county_data_path(county)
     org_units_shapefile_name = county_path / f"{county.name}_orgunits.shp"
@@ -31,8 +102,13 @@ def download_county(county: County) -> None:
         logger.warning(
             f"No org units in GeoDataFrame for {county.name} {county.state} ({county.fips}"
         )
+        # Org units saved by an earlier run would otherwise still be exported,
+        # e.g. county scope units now covered by a neighbor's state scope ones
+        for path in county_path.glob(f"{glob.escape(county.name)}_orgunits.*"):
+            logger.info(f"    Removing outdated {path}")
+            path.unlink()
     else:
-        blocks.to_file(org_units_shapefile_name)
+        blocks.rename(columns=SHAPEFILE_COLUMNS).to_file(org_units_shapefile_name)
         blocks.drop(["geometry"], axis=1).to_csv(org_units_csv_name, index=False)
 
         # write metdatada
@@ -58,6 +134,8 @@ def download_county(county: County) -> None:
             'MECE4' - # of black voters in MECE4
             'MECE5' - # of black voters in MECE5
             'city' - City in which majority of org unit is found
+            'Counties' - FIPS codes of the counties the org unit covers; it is
+                saved with the first of these
             'support_volunteer_name' -
             'support_vol_phone' -
             'support_vol_email' -
@@ -66,6 +144,12 @@ def download_county(county: County) -> None:
             'block_team_email' -
             'Notes'  -
 
+        Long field names are cut to 10 characters in the shapefile and exports
+        (e.g. 'Total_cens' for 'Total_census_population').
+
             """
             )
+        cache.record(
+            org_units_shapefile_name, f"org units clustered from {county.name}_blocks"
+        )
         logger.info(f"    Org units saved to {org_units_shapefile_name}")
@@ -1,36 +1,145 @@
 from collections import defaultdict
-from typing import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
 
 import geopandas as gpd
 import pandas as pd
 
+from . import cache
+from .geopackage import replace_counties
 from .logger import logger
-from .paths import STATES_DATA_PATH, get_county_data_path
+from .org_units import SHAPEFILE_COLUMNS
+from .paths import GEOPACKAGE_PATH, STATES_DATA_PATH, get_county_data_path
 from .types import County
 
+# Layer holding every state's org units when exporting a national GeoPackage
+NATIONAL_LAYER = "org_units"
 
-def export_counties(counties: Iterable[County]) -> None:
+def get_org_units_path(county: County) -> Path:
+    return get_county_data_path(county) / f"{county.name}_orgunits.shp"
+
+
+def read_org_units(county: County) -> Optional[gpd.GeoDataFrame]:
+    """
+    Load the saved org units for a county, or None (with a warning) if the
+    county hasn't been downloaded
+    """
+    logger.debug(f"** Loading data for {county.name}, {county.state}")
+    org_units_shapefile_name = get_org_units_path(county)
+    try:
+        return gpd.read_file(org_units_shapefile_name)
+
+    # Reading a file that doesn't exist will raise an child of ValueError
+    except ValueError as e:
+        logger.warning(e)
+        return None
+
+
+def read_counties(
+    counties: Iterable[County], workers: int = 1
+) -> Dict[County, gpd.GeoDataFrame]:
+    """
+    Load the saved org units for each county that has been downloaded. With
+    more than one worker, counties are read in separate processes, since
+    parsing shapefiles holds the GIL. The result keeps the order of `counties`.
+    """
+    downloaded = []
+    for county in counties:
+        if get_org_units_path(county).exists():
+            downloaded.append(county)
+        else:
+            logger.warning(
+                f"No org units saved for {county.name} {county.state} ({county.fips})"
+            )
+
+    if workers > 1 and len(downloaded) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(read_org_units, downloaded))
+    else:
+        results = list(map(read_org_units, downloaded))
+    county_org_units = {
+        county: org_units
+        for county, org_units in zip(downloaded, results)
+        if org_units is not None
+    }
+
+    # A single manifest update, rather than one per county from the workers
+    cache.touch(*map(get_org_units_path, county_org_units))
+    return county_org_units
+
+
+def export_counties(counties: Iterable[County], workers: int = 1) -> None:
     """
     Load saved county data and export as a single GeoJSON file
     """
 
     logger.info(f"Exporting selected data to GeoJSON file(s)")
+    write_geojson(read_counties(counties, workers), workers)
+
 
+def export_geopackage(
+    counties: Iterable[County],
+    national: bool = False,
+    workers: int = 1,
+) -> None:
+    """
+    Load saved county data and write it to the org units GeoPackage, one layer
+    per state (or a single national layer). Each county replaces its own rows,
+    so exporting a county again never rewrites the rest of the file.
+    """
+
+    logger.info(f"Exporting selected data to {GEOPACKAGE_PATH}")
+    write_geopackage(read_counties(counties, workers), national)
+
+
+def write_geojson(
+    county_org_units: Dict[County, gpd.GeoDataFrame], workers: int = 1
+) -> None:
+    """
+    Write org units to a GeoJSON file per state; with more than one worker,
+    states are written in separate processes
+    """
     shapefiles = defaultdict(list)
-    for county in counties:
-        logger.debug(f"** Loading data for {county.name}, {county.state}")
-        county_path = get_county_data_path(county)
-        org_units_shapefile_name = county_path / f"{county.name}_orgunits.shp"
-        try:
-            shapefiles[county.state].append(gpd.read_file(org_units_shapefile_name))
-
-        # Reading a file that doesn't exist will raise an child of ValueError
-        except ValueError as e:
-            logger.warning(e)
-
-    for state, counties in shapefiles.items():
-        export_file_path = STATES_DATA_PATH / state / f"{state}_shapes.json"
-        logger.debug(f"* Saving export to {export_file_path}")
-
-        gdf = pd.concat([c for c in counties]).pipe(gpd.GeoDataFrame)
-        gdf.to_file(export_file_path, driver="GeoJSON")
+    for county, org_units in county_org_units.items():
+        shapefiles[county.state].append(org_units)
+
+    if workers > 1 and len(shapefiles) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            export_files = list(
+                executor.map(write_state_geojson, shapefiles, shapefiles.values())
+            )
+    else:
+        export_files = list(map(write_state_geojson, shapefiles, shapefiles.values()))
+
+    # Recorded here since the manifest lock isn't shared with worker processes
+    for export_file_path in export_files:
+        cache.record(export_file_path, "org units export")
+
+
+def write_state_geojson(state: str, counties: List[gpd.GeoDataFrame]) -> Path:
+    export_file_path = STATES_DATA_PATH / state / f"{state}_shapes.json"
+    logger.debug(f"* Saving export to {export_file_path}")
+
+    gdf = pd.concat([c.rename(columns=SHAPEFILE_COLUMNS) for c in counties]).pipe(
+        gpd.GeoDataFrame
+    )
+    gdf.to_file(export_file_path, driver="GeoJSON")
+    return export_file_path
+
+
+def write_geopackage(
+    county_org_units: Dict[County, gpd.GeoDataFrame], national: bool = False
+) -> None:
+    """
+    Write org units to the GeoPackage, replacing each county's existing rows.
+    Layers are written one at a time since SQLite allows a single writer.
+    """
+    layers = defaultdict(dict)
+    for county, org_units in county_org_units.items():
+        layer = NATIONAL_LAYER if national else county.state
+        layers[layer][county.fips] = org_units.rename(columns=SHAPEFILE_COLUMNS)
+
+    for layer, county_frames in layers.items():
+        logger.debug(f"* Saving {len(county_frames)} counties to layer {layer}")
+        replace_counties(GEOPACKAGE_PATH, layer, county_frames)
@@ -0,0 +1,198 @@
+import sqlite3
+import struct
+from contextlib import closing
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import fiona
+import geopandas as gpd
+from shapely import wkb
+from shapely.geometry import MultiPolygon, Polygon
+from shapely.geometry.base import BaseGeometry
+
+from .logger import logger
+
+__all__ = ("replace_counties",)
+
+# Column used to find the rows belonging to a county when it is replaced
+COUNTY_COLUMN = "CountyFIPS"
+
+# Flags byte of the GeoPackage geometry header: little endian with an xy envelope
+_HEADER_FLAGS = 0b00000011
+_EMPTY_HEADER_FLAGS = 0b00010001
+# Size in bytes of the envelope for each envelope indicator code
+_ENVELOPE_SIZES = {0: 0, 1: 32, 2: 48, 3: 48, 4: 64}
+
+
+def replace_counties(
+    path: Path, layer: str, county_frames: Dict[str, gpd.GeoDataFrame]
+) -> None:
+    """Writes org units to a GeoPackage layer, replacing each county's rows
+
+    Description:
+        A new layer is first created empty with GDAL, which also creates the
+        R-tree spatial index and the triggers that keep it up to date. Each
+        county's existing rows are then deleted and its new rows inserted,
+        all in a single SQLite transaction, so the rest of the file is left
+        untouched and a failed write leaves the layer as it was.
+
+        Every county must have exactly the columns of the layer; a mismatch
+        raises a ValueError before anything is written, rather than dropping
+        or nulling the columns that differ.
+
+    Args:
+        path(Path): GeoPackage file, created if needed
+        layer(str): layer to write to (e.g. a state abbreviation)
+        county_frames(dict): org units keyed by 5 digit county FIPS code
+    """
+    frames = [
+        (fips, _prepare(frame, fips)) for fips, frame in county_frames.items()
+    ]
+
+    if not frames:
+        return
+
+    if not (path.exists() and layer in fiona.listlayers(str(path))):
+        logger.debug(f"  - Creating layer {layer} in {path}")
+        frames[0][1].iloc[:0].to_file(str(path), layer=layer, driver="GPKG")
+
+    with closing(_connect(path)) as connection:
+        with connection:
+            geometry_column, srs_id = connection.execute(
+                "SELECT column_name, srs_id FROM gpkg_geometry_columns "
+                "WHERE table_name = ?",
+                (layer,),
+            ).fetchone()
+            table_columns = [
+                row[1]
+                for row in connection.execute(f'PRAGMA table_info("{layer}")')
+                if row[1] not in ("fid", geometry_column)
+            ]
+            insert = (
+                f'INSERT INTO "{layer}" ("{geometry_column}", '
+                + ", ".join(f'"{column}"' for column in table_columns)
+                + ") VALUES ("
+                + ", ".join("?" * (len(table_columns) + 1))
+                + ")"
+            )
+
+            for fips, frame in frames:
+                _check_columns(frame, table_columns, fips, layer)
+
+            for fips, frame in frames:
+                logger.debug(f"  - Replacing {fips} in layer {layer}")
+                connection.execute(
+                    f'DELETE FROM "{layer}" WHERE "{COUNTY_COLUMN}" = ?', (fips,)
+                )
+                attributes = frame[table_columns].astype(object)
+                attributes = attributes.where(attributes.notna(), None)
+                connection.executemany(
+                    insert,
+                    (
+                        (_to_gpkg_geometry(geometry, srs_id), *values)
+                        for geometry, values in zip(
+                            frame.geometry, attributes.itertuples(index=False)
+                        )
+                    ),
+                )
+
+            _update_extent(connection, layer, geometry_column)
+
+
+def _prepare(frame: gpd.GeoDataFrame, fips: str) -> gpd.GeoDataFrame:
+    """Tags org units with their county and makes the geometry type uniform"""
+    frame = frame.copy()
+    frame[COUNTY_COLUMN] = fips
+    # Mixing polygons and multipolygons in one layer upsets some readers
+    frame["geometry"] = gpd.GeoSeries(
+        [
+            MultiPolygon([geometry]) if isinstance(geometry, Polygon) else geometry
+            for geometry in frame.geometry
+        ],
+        index=frame.index,
+        crs=frame.crs,
+    )
+    return frame
+
+
+def _check_columns(
+    frame: gpd.GeoDataFrame, table_columns: List[str], fips: str, layer: str
+) -> None:
+    """Refuses to write a county whose columns differ from the layer's"""
+    columns = set(frame.columns) - {frame.geometry.name}
+    unknown = sorted(columns - set(table_columns))
+    missing = sorted(set(table_columns) - columns)
+    if unknown or missing:
+        raise ValueError(
+            f"Org units for {fips} don't match the columns of layer {layer}: "
+            f"unknown {unknown}, missing {missing}"
+        )
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    """Opens a GeoPackage with the SQL functions used by its R-tree triggers"""
+    connection = sqlite3.connect(str(path))
+    connection.create_function("ST_IsEmpty", 1, _st_is_empty)
+    for index, name in enumerate(("ST_MinX", "ST_MaxX", "ST_MinY", "ST_MaxY")):
+        connection.create_function(name, 1, _envelope_getter(index))
+    return connection
+
+
+def _update_extent(
+    connection: sqlite3.Connection, layer: str, geometry_column: str
+) -> None:
+    """Recomputes the layer extent recorded in gpkg_contents from the R-tree"""
+    extent = connection.execute(
+        f'SELECT MIN(minx), MIN(miny), MAX(maxx), MAX(maxy) FROM "rtree_{layer}_{geometry_column}"'
+    ).fetchone()
+    connection.execute(
+        "UPDATE gpkg_contents SET min_x = ?, min_y = ?, max_x = ?, max_y = ?, "
+        "last_change = strftime('%Y-%m-%dT%H:%M:%fZ', 'now') WHERE table_name = ?",
+        (*extent, layer),
+    )
+
+
+def _to_gpkg_geometry(geometry: Optional[BaseGeometry], srs_id: int) -> Optional[bytes]:
+    """Encodes a geometry as a GeoPackage geometry blob (header + WKB)"""
+    if geometry is None:
+        return None
+    if geometry.is_empty:
+        header = struct.pack("<2sBBi", b"GP", 0, _EMPTY_HEADER_FLAGS, srs_id)
+        return header + wkb.dumps(geometry)
+
+    minx, miny, maxx, maxy = geometry.bounds
+    header = struct.pack(
+        "<2sBBi4d", b"GP", 0, _HEADER_FLAGS, srs_id, minx, maxx, miny, maxy
+    )
+    return header + wkb.dumps(geometry)
+
+
+def _envelope(blob: Optional[bytes]) -> Optional[Tuple[float, float, float, float]]:
+    """Reads (minx, maxx, miny, maxy) from a GeoPackage geometry blob"""
+    if blob is None:
+        return None
+
+    flags = blob[3]
+    if (flags >> 4) & 1:
+        return None
+    byte_order = "<" if flags & 1 else ">"
+    envelope_size = _ENVELOPE_SIZES[(flags >> 1) & 0b111]
+    if envelope_size:
+        return struct.unpack_from(f"{byte_order}4d", blob, 8)
+
+    minx, miny, maxx, maxy = wkb.loads(bytes(blob[8:])).bounds
+    return minx, maxx, miny, maxy
+
+
+def _st_is_empty(blob: Optional[bytes]) -> Optional[int]:
+    if blob is None:
+        return None
+    return int(_envelope(blob) is None)
+
+
+def _envelope_getter(index: int):
+    def getter(blob: Optional[bytes]) -> Optional[float]:
+        envelope = _envelope(blob)
+        return None if envelope is None else envelope[index]
+
+    return getter
@@ -1,22 +1,43 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from typing import List
+
 import geopandas as gpd
 import numpy as np
 import pandas as pd
 
+from .compat import parts, sjoin
 from .logger import logger
 
+# Shapefile field names are cut to 10 characters, so org units are saved and
+# exported under these names, the ones GDAL gives the long columns when it
+# truncates them; in-memory and exported org units then share one schema
+SHAPEFILE_COLUMNS = {
+    "Total_census_population": "Total_cens",
+    "Total_census_Black_population": "Total_ce_1",
+    "Pct_Black_census": "Pct_Black_",
+    "Total_Black_registered_population": "Total_Blac",
+    "square_miles": "square_mil",
+}
+
 
-def get_org_units(blocks: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+def get_org_units(blocks: gpd.GeoDataFrame, workers: int = 1) -> gpd.GeoDataFrame:
     """
-    Given a GeoDataFrame of census blocks for a county with race data, find
-    clusters of black house holds
+    Given a GeoDataFrame of census blocks for a county (or a whole state) with
+    race data, find clusters of black house holds
+
+    Each org unit's 'Counties' field lists the FIPS codes of the counties it
+    covers, which may be more than one when a whole state is clustered at once.
 
     Args:
         blocks: a GeoDataFrame of census blocks for a county with race data
+        workers: number of processes used to recluster large clusters
     """
 
     # --- Step 1. Select blocks that are majority black and add MECE count data
     logger.debug(" 1. Subsetting blocks that are majority black.")
     blocks = blocks.query("PctBlack >= 50")
+    blocks = blocks.assign(Counties=blocks.BLOCKID10.fillna(blocks.GEOID10).str[:5])
 
     # --- Step 3. Subset majority black blocks with > 50 black HH and save as org1
     #  to be merged with other org units later.
@@ -36,7 +57,7 @@ def get_org_units(blocks: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
     logger.debug("  4a. Finding intitial clusters...")
 
     if len(black_hh_lt50) > 1:
-        clusters = gpd.GeoDataFrame(geometry=list(black_hh_lt50.unary_union))
+        clusters = gpd.GeoDataFrame(geometry=parts(black_hh_lt50.unary_union))
     else:
         clusters = gpd.GeoDataFrame(black_hh_lt50["geometry"]).reset_index()
     clusters["ClusterID"] = clusters.index
@@ -45,14 +66,15 @@ def get_org_units(blocks: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
     # Step 4b. Recalculate population stats for the clusters
     logger.debug("  4b. Computing number of black households in new clusters...")
     # -> Done by first spatially joining the cluster ID to the blocks w/ < 50 Black HH
-    black_hh_lt50_2 = gpd.sjoin(black_hh_lt50, clusters, how="left", op="within").drop(
-        "index_right", axis=1
-    )
+    black_hh_lt50_2 = sjoin(
+        black_hh_lt50, clusters, how="left", predicate="within"
+    ).drop("index_right", axis=1)
     # -> Next we dissolve on the cluster ID computing SUM of the numeric attributes
     #    and updating the percentage fields
     clusters_2 = black_hh_lt50_2.dissolve(by="ClusterID", aggfunc="sum")
     clusters_2["PctBlack"] = clusters_2["P003003"] / clusters_2["P003001"] * 100
     clusters_2["PctBlack18"] = clusters_2["P010004"] / clusters_2["P010001"] * 100
+    clusters_2["Counties"] = join_counties(black_hh_lt50_2, "ClusterID")
 
     # Step 4c. Remove block clusters with fewer than 50 BHH; these are impractical
     logger.debug(
@@ -75,67 +97,21 @@ def get_org_units(blocks: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
     #   we'll cluster individual blocks with these IDs until BHH >= 100
     cluster_ids = clusters_2.query("BlackHH > 100").index.unique()
 
-    # Iterate through each cluster_id
-    reclustered = []
-    for cluster_id in cluster_ids:
-        # Get all the blocks in the selected cluster
-        gdfBlksAll = black_hh_lt50_2.query(f"ClusterID == {cluster_id}").reset_index()
-        # Assign the X coordinate, used to select the first feature in a sub-cluster
-        gdfBlksAll["X"] = gdfBlksAll.geometry.centroid.x
-        # Set all blocks to "unclaimed"
-        gdfBlksAll["claimed"] = 0
-        # Determine how many blocks are unclaimed
-        unclaimedCount = gdfBlksAll.query("claimed == 0")["X"].count()
-        # Initialize the loop catch variable
-        stopLoop = 0
-        # Run until all blocks have been "claimed"
-        while unclaimedCount > 0:
-
-            # Extract all unclaimed blocks
-            gdfBlks = gdfBlksAll[gdfBlksAll.claimed == 0].reset_index()
-
-            # Get the initial block (the western most one); get its BHH and geometry
-            gdfBlock = gdfBlks[gdfBlks.X == gdfBlks.X.min()]
-            BHH = gdfBlock.BlackHH.sum()
-            geom = gdfBlock.geometry.unary_union
-
-            # Expand the geometry until 100 BHH are found
-            stopLoop2 = 0  # Loop break check
-            while BHH < 100:
-                # Select unclaimed blocks that within the area
-                gdfNbrs = gdfBlksAll[(gdfBlksAll.touches(geom))]
-                gdfBoth = pd.concat((gdfBlock, gdfNbrs), axis="rows", sort=False)
-                gdfBlock = gdfBoth.copy(deep=True)
-                # Tally the BHHs in the area and update the area shape
-                BHH = gdfBoth.BlackHH.sum()
-                geom = gdfBoth.geometry.unary_union
-                # Catch if run 100 times without getting to 100 BHH
-                stopLoop2 += 1
-                if stopLoop2 > 100:
-                    logger.debug("BHH never reached 100")
-                    break
-
-            # Extract features intersecting the geometry to a new dataframe
-            gdfSelect = (
-                gdfBlksAll[
-                    (gdfBlksAll.centroid.within(geom)) & (gdfBlksAll.claimed == 0)
-                ]
-                .reset_index()
-                .dissolve(by="ClusterID", aggfunc="sum")
-                .drop(["level_0", "index", "X"], axis=1)
+    # Each cluster is an independent connected component of adjacent blocks, so
+    # they can be reclustered in parallel
+    cluster_blocks = [
+        cluster
+        for _, cluster in black_hh_lt50_2[
+            black_hh_lt50_2.ClusterID.isin(cluster_ids)
+        ].groupby("ClusterID")
+    ]
+    if workers > 1 and len(cluster_blocks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            reclustered = list(
+                chain.from_iterable(executor.map(recluster_blocks, cluster_blocks))
             )
-
-            # Set all features intersecting the shape as "claimed"
-            gdfBlksAll.loc[gdfBlksAll.geometry.centroid.within(geom), "claimed"] = 1
-            unclaimedCount = gdfBlksAll.query("claimed == 0")["X"].count()
-
-            # Add the dataframe to the list of datarames
-            reclustered.append(gdfSelect[gdfSelect["BlackHH"] >= 50])
-
-            # Stop the loop if run for over 100 iterations
-            stopLoop += 1
-            if stopLoop > 100:
-                break
+    else:
+        reclustered = list(chain.from_iterable(map(recluster_blocks, cluster_blocks)))
 
     org_units_list = [org1, org2]
 
@@ -214,6 +190,7 @@ def get_org_units(blocks: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
             "MECE4",
             "MECE5",
             "city",
+            "Counties",
             "geometry",
         ],
     ]
@@ -231,3 +208,80 @@ def get_org_units(blocks: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
         all_org_units_out[new_col] = ""
 
     return all_org_units
+
+
+def recluster_blocks(cluster: gpd.GeoDataFrame) -> List[gpd.GeoDataFrame]:
+    """
+    Split a cluster of adjacent blocks with more than 100 black households into
+    aggregates of up to 100 black households, starting from the western most
+    block and growing outward
+
+    Args:
+        cluster: the blocks (with fewer than 50 BHH) of a single ClusterID
+    """
+    reclustered = []
+    gdfBlksAll = cluster.reset_index()
+    # Assign the X coordinate, used to select the first feature in a sub-cluster
+    gdfBlksAll["X"] = gdfBlksAll.geometry.centroid.x
+    # Set all blocks to "unclaimed"
+    gdfBlksAll["claimed"] = 0
+    # Determine how many blocks are unclaimed
+    unclaimedCount = gdfBlksAll.query("claimed == 0")["X"].count()
+    # Initialize the loop catch variable
+    stopLoop = 0
+    # Run until all blocks have been "claimed"
+    while unclaimedCount > 0:
+
+        # Extract all unclaimed blocks
+        gdfBlks = gdfBlksAll[gdfBlksAll.claimed == 0].reset_index()
+
+        # Get the initial block (the western most one); get its BHH and geometry
+        gdfBlock = gdfBlks[gdfBlks.X == gdfBlks.X.min()]
+        BHH = gdfBlock.BlackHH.sum()
+        geom = gdfBlock.geometry.unary_union
+
+        # Expand the geometry until 100 BHH are found
+        stopLoop2 = 0  # Loop break check
+        while BHH < 100:
+            # Select unclaimed blocks that within the area
+            gdfNbrs = gdfBlksAll[(gdfBlksAll.touches(geom))]
+            gdfBoth = pd.concat((gdfBlock, gdfNbrs), axis="rows", sort=False)
+            gdfBlock = gdfBoth.copy(deep=True)
+            # Tally the BHHs in the area and update the area shape
+            BHH = gdfBoth.BlackHH.sum()
+            geom = gdfBoth.geometry.unary_union
+            # Catch if run 100 times without getting to 100 BHH
+            stopLoop2 += 1
+            if stopLoop2 > 100:
+                logger.debug("BHH never reached 100")
+                break
+
+        # Extract features intersecting the geometry to a new dataframe
+        gdfSelected = gdfBlksAll[
+            (gdfBlksAll.centroid.within(geom)) & (gdfBlksAll.claimed == 0)
+        ].reset_index()
+        gdfSelect = gdfSelected.dissolve(by="ClusterID", aggfunc="sum").drop(
+            ["level_0", "index", "X"], axis=1
+        )
+        gdfSelect["Counties"] = join_counties(gdfSelected, "ClusterID")
+
+        # Set all features intersecting the shape as "claimed"
+        gdfBlksAll.loc[gdfBlksAll.geometry.centroid.within(geom), "claimed"] = 1
+        unclaimedCount = gdfBlksAll.query("claimed == 0")["X"].count()
+
+        # Add the dataframe to the list of datarames
+        reclustered.append(gdfSelect[gdfSelect["BlackHH"] >= 50])
+
+        # Stop the loop if run for over 100 iterations
+        stopLoop += 1
+        if stopLoop > 100:
+            break
+
+    return reclustered
+
+
+def join_counties(blocks: pd.DataFrame, by: str) -> pd.Series:
+    """
+    Comma separated county FIPS codes covered by each group of blocks
+    """
+    return blocks.groupby(by)["Counties"].agg(lambda c: ",".join(sorted(set(c))))
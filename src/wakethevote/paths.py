@@ -5,6 +5,7 @@ from .types import County
 DATA_PATH = Path(__file__).resolve().parents[2] / "data"
 FIPS_TSV_PATH = DATA_PATH / "fips.tsv"
 STATES_DATA_PATH = DATA_PATH / "states"
+GEOPACKAGE_PATH = DATA_PATH / "org_units.gpkg"
 
 
 def get_census_data_path(state: str):
@@ -0,0 +1,103 @@
+from typing import Dict, Iterable, Optional
+
+import folium
+import geopandas as gpd
+
+from .census import DEFAULT_CHUNK_SIZE, load_census_block_data
+from .download import get_state_org_units, save_org_units
+from .export import write_geojson, write_geopackage
+from .org_units import get_org_units
+from .preview import make_preview_map, save_preview
+from .types import County
+
+__all__ = ("Pipeline",)
+
+
+class Pipeline:
+    """Runs load -> cluster -> export/preview in memory
+
+    Blocks and org units are kept on the pipeline once computed, so later
+    calls for the same county reuse them instead of reading shapefiles back
+    from disk. Org unit outputs are only written by `save`, `export` and
+    `preview(save=True)`.
+
+    Loading blocks still goes through the on-disk data cache in data/states:
+    the first load of a state downloads and splits its block features, and
+    the first load of a county saves `{county}_blocks.shp`, exactly as
+    `--download` does. Later loads read those files instead of the Census.
+
+    Example:
+        >>> from wakethevote import Pipeline
+        >>> from wakethevote.counties import find_counties
+        >>> pipeline = Pipeline()
+        >>> wake = next(find_counties("Wake NC"))
+        >>> pipeline.org_units(wake).BlackHH.sum()
+        >>> pipeline.preview(wake)  # a folium map, shown inline in notebooks
+
+    Args:
+        chunk_size(int): number of block features to read at a time
+        workers(int): number of processes used for clustering
+    """
+
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE, workers: int = 1):
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self._blocks: Dict[County, gpd.GeoDataFrame] = {}
+        self._org_units: Dict[County, gpd.GeoDataFrame] = {}
+
+    def blocks(self, county: County) -> gpd.GeoDataFrame:
+        """Census blocks for a county with race data"""
+        if county not in self._blocks:
+            self._blocks[county] = load_census_block_data(county, self.chunk_size)
+        return self._blocks[county]
+
+    def org_units(self, county: County) -> gpd.GeoDataFrame:
+        """Org units for a county, clustered on their own"""
+        if county not in self._org_units:
+            self._org_units[county] = get_org_units(self.blocks(county), self.workers)
+        return self._org_units[county]
+
+    def cluster_state(self, counties: Iterable[County]) -> None:
+        """
+        Cluster counties together so org units can cross county lines; this
+        replaces any org units already computed for them
+        """
+        county_blocks = {county: self.blocks(county) for county in counties}
+        self._org_units.update(get_state_org_units(county_blocks, self.workers))
+
+    def save(self, county: County) -> None:
+        """Write a county's org units to its data folder, like `--download`"""
+        save_org_units(county, self.org_units(county))
+
+    def export(
+        self, counties: Iterable[County], format: str = "geojson", national: bool = False
+    ) -> None:
+        """
+        Export org units as GeoJSON per state or to the GeoPackage, with the
+        same 10 character column names as `--export`
+        """
+        county_org_units = {county: self.org_units(county) for county in counties}
+        if format == "gpkg":
+            write_geopackage(county_org_units, national)
+        else:
+            write_geojson(county_org_units)
+
+    def preview(self, county: County, save: bool = False) -> folium.Map:
+        """
+        Map of a county's org units; with `save`, also write it as HTML and
+        open it in a browser
+        """
+        m = make_preview_map(self.org_units(county))
+        if save:
+            save_preview(county, m)
+        return m
+
+    def clear(self, counties: Optional[Iterable[County]] = None) -> None:
+        """Forget cached blocks and org units for some (or all) counties"""
+        if counties is None:
+            self._blocks.clear()
+            self._org_units.clear()
+            return
+        for county in counties:
+            self._blocks.pop(county, None)
+            self._org_units.pop(county, None)
@@ -3,6 +3,7 @@ import webbrowser
 import folium
 import geopandas as gpd
 
+from . import cache
 from .logger import logger
 from .paths import get_county_data_path
 from .types import County
@@ -18,6 +19,11 @@ def preview_county(county: County) -> None:
     logger.debug(f" - Reading shapefile from {shapefile_name}")
     org_units = gpd.read_file(shapefile_name)
 
+    save_preview(county, make_preview_map(org_units))
+
+
+def make_preview_map(org_units: gpd.GeoDataFrame) -> folium.Map:
+    """Build a folium map of org units, centered on them"""
     # Get centroid
     centroid = org_units.unary_union.centroid
 
@@ -33,9 +39,16 @@ def preview_county(county: County) -> None:
     # Add the JSON to the map
     lyrUnits.add_to(m)
 
+    return m
+
+
+def save_preview(county: County, m: folium.Map) -> None:
+    """Save a preview map as HTML in the county folder and open it in a browser"""
     # Save the map
+    county_path = get_county_data_path(county)
     map_file_name = county_path / f"{county.name}_preview.html"
     logger.debug(f" - Saving HTML map file to {map_file_name}")
     m.save(str(map_file_name))
+    cache.record(map_file_name, f"preview of {county.name}_orgunits")
 
     webbrowser.open(f"file://{map_file_name}")
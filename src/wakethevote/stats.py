@@ -0,0 +1,269 @@
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Set, Tuple
+
+import fiona
+import geopandas as gpd
+import pandas as pd
+import requests
+
+from . import cache
+from .census import DEFAULT_CHUNK_SIZE, load_census_block_data
+from .compat import sjoin
+from .logger import logger
+from .paths import get_county_data_path
+from .types import County
+
+__all__ = ("get_stats", "summarize_states")
+
+STATS_COLUMNS = [
+    "fips",
+    "name",
+    "state",
+    "org_units",
+    "BlackHH",
+    "Total_census_population",
+    "Total_census_Black_population",
+    "County_BlackHH",
+    "Pct_BlackHH_covered",
+]
+
+
+def get_stats(
+    counties: Iterable[County], chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> pd.DataFrame:
+    """Planning numbers for each county without building org unit geometry
+
+    Description:
+        Counts org units and totals the black households (BHH) and population
+        they cover, using only the block attribute table and a cached block
+        adjacency list; no polygons are unioned, reprojected or written.
+
+        Org units follow the same rules as `get_org_units`, but clusters with
+        more than 100 BHH are split by growing outward over the adjacency
+        graph rather than over the block shapes. Seeds are picked by block ID
+        instead of from the west and blocks meeting only at a corner are not
+        grown into, so counts for those clusters are close estimates rather
+        than exact matches.
+
+    Args:
+        counties: counties to summarize
+        chunk_size(int): number of block features to read at a time when the
+            census data still has to be downloaded
+
+    Returns:
+        dataframe with one row per county (see STATS_COLUMNS)
+    """
+    rows = []
+    for county in counties:
+        logger.info(f"Computing stats for {county.name} {county.state} ({county.fips})")
+        try:
+            blocks, adjacency = load_block_tables(county, chunk_size)
+        except requests.exceptions.RequestException as e:
+            logger.warning(e)
+            continue
+
+        org_units = count_org_units(blocks, adjacency)
+        rows.append(
+            {
+                "fips": county.fips,
+                "name": county.name,
+                "state": county.state,
+                "org_units": len(org_units),
+                "BlackHH": org_units.BlackHH.sum(),
+                "Total_census_population": org_units.P003001.sum(),
+                "Total_census_Black_population": org_units.P003003.sum(),
+                "County_BlackHH": blocks.BlackHH.sum(),
+            }
+        )
+
+    stats = pd.DataFrame(rows, columns=STATS_COLUMNS)
+    return _with_coverage(stats)
+
+
+def summarize_states(stats: pd.DataFrame) -> pd.DataFrame:
+    """Totals county stats (from `get_stats`) by state
+
+    Counties are still clustered on their own, so the totals are sums of
+    county scope counts: an org unit that `--download --state-scope` would
+    build across a county line is counted in each county here instead, and
+    the state's org unit count can differ from what that mode produces.
+    """
+    totals = stats.groupby("state", sort=False).sum(numeric_only=True).reset_index()
+    totals["fips"] = stats.groupby("state", sort=False).fips.first().str[:2].values
+    totals["name"] = totals.state
+    return _with_coverage(totals.reindex(columns=STATS_COLUMNS))
+
+
+def _with_coverage(stats: pd.DataFrame) -> pd.DataFrame:
+    stats["Pct_BlackHH_covered"] = (
+        stats.BlackHH / stats.County_BlackHH.where(stats.County_BlackHH > 0) * 100
+    ).fillna(0)
+    return stats
+
+
+def load_block_tables(
+    county: County, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Loads a county's block attributes and block adjacency list
+
+    The adjacency list is built from the block shapes the first time and
+    cached as `{county}_adjacency.csv`; after that only the block attribute
+    table is read, skipping the geometry entirely.
+
+    Returns:
+        (block attributes, adjacency list with 'block' and 'neighbor' columns)
+    """
+    county_path = get_county_data_path(county)
+    county_block_file = county_path / f"{county.name}_blocks.shp"
+    adjacency_file = county_path / f"{county.name}_adjacency.csv"
+
+    if county_block_file.exists() and adjacency_file.exists():
+        logger.debug(f" - Loading block attributes from {county_block_file}")
+        cache.touch(county_block_file, adjacency_file)
+        return (
+            read_block_attributes(county_block_file),
+            pd.read_csv(adjacency_file, dtype=str),
+        )
+
+    blocks = load_census_block_data(county, chunk_size)
+    logger.debug(f" - Saving block adjacency to {adjacency_file}")
+    adjacency = get_block_adjacency(blocks)
+    adjacency.to_csv(adjacency_file, index=False)
+    cache.record(adjacency_file, f"block adjacency of {county_block_file.name}")
+
+    return pd.DataFrame(blocks.drop(columns="geometry")), adjacency
+
+
+def read_block_attributes(path: Path) -> pd.DataFrame:
+    """Reads the attribute table of a block shapefile without its geometry"""
+    with fiona.open(str(path), ignore_geometry=True) as collection:
+        return pd.DataFrame([dict(feature["properties"]) for feature in collection])
+
+
+def get_block_adjacency(blocks: gpd.GeoDataFrame) -> pd.DataFrame:
+    """Pairs of majority black blocks with < 50 BHH that share an edge
+
+    Only these blocks are ever clustered together, so the adjacency list is
+    limited to them. Blocks that only meet at a corner are not adjacent,
+    matching how `get_org_units` unions blocks into clusters.
+    """
+    candidates = blocks.query("PctBlack >= 50 and BlackHH < 50")
+    candidates = candidates[candidates.geometry.notna()]
+    candidates = gpd.GeoDataFrame(
+        {"block": _block_ids(candidates)},
+        geometry=candidates.geometry.values,
+        crs=blocks.crs,
+    )
+
+    pairs = sjoin(candidates, candidates, how="inner", predicate="intersects")
+    pairs = pairs[pairs.index != pairs.index_right].reset_index(drop=True)
+    neighbors = gpd.GeoSeries(
+        candidates.geometry.loc[pairs.index_right].values, index=pairs.index
+    )
+    shares_edge = pairs.geometry.intersection(neighbors).length > 0
+
+    return pd.DataFrame(
+        {
+            "block": pairs.block_left[shares_edge].values,
+            "neighbor": pairs.block_right[shares_edge].values,
+        }
+    )
+
+
+def count_org_units(blocks: pd.DataFrame, adjacency: pd.DataFrame) -> pd.DataFrame:
+    """Finds org units from block attributes and adjacency alone
+
+    Args:
+        blocks: block attributes (BLOCKID10, PctBlack, BlackHH, P003001, P003003)
+        adjacency: adjacency list from `get_block_adjacency`
+
+    Returns:
+        dataframe with one row per org unit: OrgType, BlackHH, P003001, P003003
+    """
+    columns = ["BlackHH", "P003001", "P003003"]
+    blocks = blocks.assign(block=_block_ids(blocks)).query("PctBlack >= 50")
+
+    # Majority black blocks with more than 50 BHH are org units on their own
+    org1 = blocks.query("BlackHH > 50")[columns].assign(OrgType="block")
+
+    # The rest are clustered with their neighbors
+    black_hh_lt50 = blocks.query("BlackHH < 50").set_index("block")[columns]
+    neighbors: Dict[str, Set[str]] = defaultdict(set)
+    for block, neighbor in adjacency.itertuples(index=False):
+        if block in black_hh_lt50.index and neighbor in black_hh_lt50.index:
+            neighbors[block].add(neighbor)
+            neighbors[neighbor].add(block)
+
+    black_hh = black_hh_lt50.BlackHH.to_dict()
+    units: List[List[str]] = []
+    for component in _connected_components(black_hh_lt50.index, neighbors):
+        total = sum(black_hh[block] for block in component)
+        if total > 100:
+            units.extend(_split_component(component, neighbors, black_hh))
+        elif total >= 50:
+            units.append(component)
+
+    unit_ids = {block: unit_id for unit_id, unit in enumerate(units) for block in unit}
+    members = black_hh_lt50[black_hh_lt50.index.isin(unit_ids)]
+    aggregates = (
+        members.groupby(members.index.map(unit_ids))
+        .sum()
+        .assign(OrgType="block aggregate")
+    )
+
+    return pd.concat([org1, aggregates], ignore_index=True, sort=False)
+
+
+def _block_ids(blocks: pd.DataFrame) -> pd.Series:
+    return blocks.BLOCKID10.fillna(blocks.GEOID10)
+
+
+def _connected_components(
+    blocks: Iterable[str], neighbors: Dict[str, Set[str]]
+) -> List[List[str]]:
+    seen: Set[str] = set()
+    components = []
+    for start in blocks:
+        if start in seen:
+            continue
+        seen.add(start)
+        component, stack = [], [start]
+        while stack:
+            block = stack.pop()
+            component.append(block)
+            for neighbor in neighbors[block] - seen:
+                seen.add(neighbor)
+                stack.append(neighbor)
+        components.append(component)
+    return components
+
+
+def _split_component(
+    component: List[str], neighbors: Dict[str, Set[str]], black_hh: Dict[str, int]
+) -> List[List[str]]:
+    """Grows aggregates ring by ring from a seed block until they reach 100 BHH
+
+    As in `recluster_blocks`, an aggregate grows over blocks already claimed
+    by earlier ones but only claims the unclaimed blocks it reaches, and is
+    dropped if those have fewer than 50 BHH. Seeds are taken in block ID
+    order rather than from the west, which is where the two can differ.
+    """
+    unclaimed = set(component)
+    units = []
+    while unclaimed:
+        seed = min(unclaimed)
+        unit, ring = {seed}, {seed}
+        total = black_hh[seed]
+        while total < 100:
+            ring = {n for block in ring for n in neighbors[block]} - unit
+            if not ring:
+                break
+            unit |= ring
+            total += sum(black_hh[block] for block in ring)
+
+        unit &= unclaimed
+        unclaimed -= unit
+        if sum(black_hh[block] for block in unit) >= 50:
+            units.append(sorted(unit))
+    return units
@@ -0,0 +1,104 @@
+import pytest
+
+from wakethevote import cache
+
+
+@pytest.fixture
+def cache_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_ROOT", tmp_path)
+    return tmp_path
+
+
+def write(path, size):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    return path
+
+
+def test_artifact_grouping(cache_root):
+    write(cache_root / "NC/census/blocks/183.shp", 100)
+    write(cache_root / "NC/census/blocks/183.dbf", 50)
+    write(cache_root / "NC/counties/Wake/Wake_blocks.shp", 10)
+    write(cache_root / "NC/counties/Wake/Wake_blocks.txt", 5)
+    write(cache_root / "NC/counties/Wake/Wake_orgunits.shp", 20)
+    write(cache_root / "NC/counties/Wake/README.txt", 1)
+
+    artifacts = {artifact.key: artifact for artifact in cache.list_artifacts()}
+    assert artifacts["NC/census/blocks"].size == 150
+    assert artifacts["NC/counties/Wake/Wake_blocks"].size == 15
+    assert not artifacts["NC/census/blocks"].protected
+    assert not artifacts["NC/counties/Wake/Wake_blocks"].protected
+    assert artifacts["NC/counties/Wake/Wake_orgunits"].protected
+    assert artifacts["NC/counties/Wake/README"].protected
+
+
+def test_record_and_touch(cache_root, tmp_path_factory):
+    zip_file = write(cache_root / "NC/census/tabblock2010_37_pophu.zip", 10)
+    cache.record(zip_file, "https://example.com/blocks.zip")
+    (artifact,) = cache.list_artifacts()
+    assert artifact.provenance == "https://example.com/blocks.zip"
+
+    cache.touch(zip_file)
+    (touched,) = cache.list_artifacts()
+    assert touched.last_used >= artifact.last_used
+
+    # Paths outside the cache are ignored
+    cache.record(tmp_path_factory.mktemp("elsewhere") / "file.shp", "elsewhere")
+    assert len(cache.list_artifacts()) == 1
+
+
+def test_enforce_budget_evicts_least_recently_used(cache_root, monkeypatch):
+    clock = iter(range(1000))
+    monkeypatch.setattr(cache.time, "time", lambda: next(clock))
+
+    old = write(cache_root / "NC/census/tabblock2010_37_pophu.zip", 100)
+    new = write(cache_root / "NC/counties/Wake/Wake_blocks.shp", 100)
+    output = write(cache_root / "NC/counties/Wake/Wake_orgunits.shp", 100)
+    cache.record(old, "old")
+    cache.record(new, "new")
+    cache.record(output, "output")
+    cache.touch(old)
+    cache.touch(new)
+
+    (would_evict,) = cache.enforce_budget(250, dry_run=True)
+    assert would_evict.key == "NC/census/tabblock2010_37_pophu"
+    assert old.exists()
+
+    evicted = cache.enforce_budget(250)
+    assert [artifact.key for artifact in evicted] == ["NC/census/tabblock2010_37_pophu"]
+    assert not old.exists() and new.exists()
+
+    # Org units are never evicted, even over budget
+    cache.enforce_budget(0)
+    assert not new.exists() and output.exists()
+
+
+def test_dotted_county_name(cache_root):
+    county_path = cache_root / "MO/counties/Ste. Genevieve"
+    write(county_path / "Ste. Genevieve_blocks.shp", 10)
+    write(county_path / "Ste. Genevieve_blocks.dbf", 10)
+    write(county_path / "Ste. Genevieve_orgunits.shp", 10)
+
+    artifacts = {artifact.key: artifact for artifact in cache.list_artifacts()}
+    blocks = artifacts["MO/counties/Ste. Genevieve/Ste. Genevieve_blocks"]
+    assert blocks.size == 20 and not blocks.protected
+    assert artifacts["MO/counties/Ste. Genevieve/Ste. Genevieve_orgunits"].protected
+
+    cache.remove(blocks.key)
+    assert [path.name for path in county_path.iterdir()] == [
+        "Ste. Genevieve_orgunits.shp"
+    ]
+
+
+def test_touch_many(cache_root, monkeypatch):
+    writes = []
+    write_manifest = cache._write_manifest
+    monkeypatch.setattr(
+        cache, "_write_manifest", lambda manifest: writes.append(write_manifest(manifest))
+    )
+
+    paths = [write(cache_root / f"NC/counties/C{i}/C{i}_orgunits.shp", 1) for i in range(5)]
+    cache.touch(*paths)
+    assert len(writes) == 1
+    assert all(artifact.provenance == "unknown" for artifact in cache.list_artifacts())
+    assert len(cache._read_manifest()) == 5
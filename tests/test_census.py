@@ -0,0 +1,60 @@
+import fiona
+import pytest
+import requests
+from shapely.geometry import box, mapping
+
+from wakethevote import census
+from wakethevote.census import (
+    BYTES_PER_BLOCK,
+    chunk_size_for_memory,
+    partition_state_blocks,
+)
+from wakethevote.types import County
+
+SCHEMA = {"geometry": "Polygon", "properties": {"BLOCKID10": "str", "COUNTYFP10": "str"}}
+
+
+def write_state_blocks(path):
+    with fiona.open(
+        path, "w", driver="ESRI Shapefile", schema=SCHEMA, crs="EPSG:4269"
+    ) as sink:
+        for i in range(10):
+            county_fips = "001" if i < 6 else "003"
+            sink.write(
+                {
+                    "geometry": mapping(box(i, 0, i + 1, 1)),
+                    "properties": {
+                        "BLOCKID10": f"37{county_fips}{i:010}",
+                        "COUNTYFP10": county_fips,
+                    },
+                }
+            )
+
+
+def test_chunk_size_for_memory():
+    assert chunk_size_for_memory(4 * BYTES_PER_BLOCK * 100) == 100
+    assert chunk_size_for_memory(1) == 1
+
+
+def test_partition_state_blocks(tmp_path):
+    state_file = tmp_path / "StateBlocks.shp"
+    write_state_blocks(state_file)
+
+    partition_path = tmp_path / "blocks"
+    partition_state_blocks(str(state_file), partition_path, chunk_size=4)
+
+    assert not (tmp_path / "blocks.partial").exists()
+    for county_fips, count in (("001", 6), ("003", 4)):
+        with fiona.open(partition_path / f"{county_fips}.shp") as collection:
+            assert len(collection) == count
+            assert {f["properties"]["COUNTYFP10"] for f in collection} == {county_fips}
+
+
+def test_county_missing_from_partition(tmp_path, monkeypatch):
+    monkeypatch.setenv("CENSUS_API_KEY", "key")
+    monkeypatch.setattr(census, "get_county_data_path", lambda county: tmp_path)
+    monkeypatch.setattr(census, "get_census_data_path", lambda state: tmp_path)
+    (tmp_path / "blocks").mkdir()
+
+    with pytest.raises(requests.exceptions.RequestException, match="37183"):
+        census.load_census_block_data(County("37183", "Wake", "NC"))
@@ -0,0 +1,45 @@
+import argparse
+import json
+import sys
+
+import pandas as pd
+import pytest
+
+from wakethevote import cli
+from wakethevote.cli import parse_size, positive_int
+
+
+def test_parse_size_units():
+    assert parse_size("512") == 512
+    assert parse_size("512M") == 512 * 1024 ** 2
+    assert parse_size("2g") == 2 * 1024 ** 3
+    assert parse_size("1.5GB") == int(1.5 * 1024 ** 3)
+
+
+def test_parse_size_invalid():
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_size("lots")
+
+
+def test_positive_int():
+    assert positive_int("4") == 4
+    for text in ("0", "-1", "four"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            positive_int(text)
+
+
+def test_stats_json(monkeypatch, capsys):
+    stats = pd.DataFrame(
+        {"fips": ["37183"], "name": ["Wake"], "org_units": [3], "BlackHH": [150]}
+    )
+    monkeypatch.setattr(cli, "find_counties", lambda selection: [])
+    monkeypatch.setattr(cli, "get_stats", lambda counties, chunk_size: stats)
+    monkeypatch.setattr(
+        sys, "argv", ["wakevote", "Wake NC", "--stats", "--stats-format", "json"]
+    )
+
+    cli.main()
+
+    assert json.loads(capsys.readouterr().out) == [
+        {"fips": "37183", "name": "Wake", "org_units": 3, "BlackHH": 150}
+    ]
@@ -0,0 +1,16 @@
+import geopandas as gpd
+from shapely.geometry import MultiPolygon, box
+
+from wakethevote.compat import parts, sjoin
+
+
+def test_parts():
+    assert parts(box(0, 0, 1, 1)) == [box(0, 0, 1, 1)]
+    assert len(parts(MultiPolygon([box(0, 0, 1, 1), box(2, 0, 3, 1)]))) == 2
+
+
+def test_sjoin():
+    blocks = gpd.GeoDataFrame(geometry=[box(0, 0, 1, 1), box(5, 5, 6, 6)])
+    clusters = gpd.GeoDataFrame(geometry=[box(-1, -1, 2, 2)])
+    joined = sjoin(blocks, clusters, how="inner", predicate="within")
+    assert list(joined.index) == [0]
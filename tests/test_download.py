@@ -0,0 +1,81 @@
+import geopandas as gpd
+from shapely.geometry import box
+
+from wakethevote import download, export
+from wakethevote.types import County
+
+WAKE = County("37183", "Wake", "NC")
+DURHAM = County("37063", "Durham", "NC")
+
+
+def state_org_units(monkeypatch):
+    def fake_get_org_units(blocks, workers):
+        return gpd.GeoDataFrame(
+            {
+                "RandomID": [1, 2, 3],
+                "BlackHH": [60, 70, 80],
+                "Counties": ["37183", "37063,37183", "37063"],
+            },
+            geometry=[box(0, 0, 1, 1), box(1, 0, 2, 1), box(2, 0, 3, 1)],
+            crs="EPSG:4269",
+        )
+
+    monkeypatch.setattr(download, "get_org_units", fake_get_org_units)
+    blocks = gpd.GeoDataFrame(
+        {"PctBlack": [75.0]}, geometry=[box(0, 0, 1, 1)], crs="EPSG:4269"
+    )
+    return download.get_state_org_units({WAKE: blocks, DURHAM: blocks})
+
+
+def test_get_state_org_units_splits_by_owning_county(monkeypatch):
+    county_org_units = state_org_units(monkeypatch)
+    assert list(county_org_units[WAKE].RandomID) == [1]
+    # The unit crossing the county line belongs to the lowest FIPS it covers
+    assert list(county_org_units[DURHAM].RandomID) == [2, 3]
+    assert county_org_units[DURHAM].Counties.iloc[0] == "37063,37183"
+
+
+def test_crossing_org_unit_exported_once(monkeypatch, tmp_path):
+    county_org_units = state_org_units(monkeypatch)
+    monkeypatch.setattr(export, "STATES_DATA_PATH", tmp_path)
+    (tmp_path / "NC").mkdir()
+
+    export.write_geojson(county_org_units)
+
+    shapes = gpd.read_file(tmp_path / "NC" / "NC_shapes.json")
+    assert sorted(shapes.RandomID) == [1, 2, 3]
+    assert shapes.BlackHH.sum() == 210
+
+
+def test_download_state_keeps_only_majority_black_blocks(monkeypatch):
+    def fake_load(county, chunk_size):
+        return gpd.GeoDataFrame(
+            {"PctBlack": [75.0, 20.0]},
+            geometry=[box(0, 0, 1, 1), box(1, 0, 2, 1)],
+            crs="EPSG:4269",
+        )
+
+    clustered = {}
+    monkeypatch.setattr(download, "load_census_block_data", fake_load)
+    monkeypatch.setattr(
+        download,
+        "get_state_org_units",
+        lambda county_blocks, workers: clustered.update(county_blocks) or {},
+    )
+
+    download.download_state([WAKE, DURHAM])
+    assert {county: len(blocks) for county, blocks in clustered.items()} == {
+        WAKE: 1,
+        DURHAM: 1,
+    }
+
+
+def test_county_without_org_units_drops_old_ones(monkeypatch, tmp_path):
+    monkeypatch.setattr(download, "get_county_data_path", lambda county: tmp_path)
+    county_org_units = state_org_units(monkeypatch)
+
+    # Wake was downloaded on its own before, then clustered with the state
+    download.save_org_units(WAKE, county_org_units[DURHAM])
+    download.save_org_units(WAKE, county_org_units[WAKE].iloc[:0])
+
+    assert not list(tmp_path.glob("Wake_orgunits.*"))
@@ -0,0 +1,41 @@
+import logging
+
+import geopandas as gpd
+from shapely.geometry import box
+
+from wakethevote import export
+from wakethevote.types import County
+
+COUNTIES = [
+    County("37183", "Wake", "NC"),
+    County("13177", "Lee", "GA"),
+    County("37063", "Durham", "NC"),
+    County("37001", "Alamance", "NC"),
+]
+
+
+def test_export_counties(tmp_path, monkeypatch, caplog):
+    def county_path(county):
+        path = tmp_path / county.state / "counties" / county.name
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    monkeypatch.setattr(export, "get_county_data_path", county_path)
+    monkeypatch.setattr(export, "STATES_DATA_PATH", tmp_path)
+
+    # Alamance has not been downloaded
+    for i, county in enumerate(COUNTIES[:3]):
+        gpd.GeoDataFrame(
+            {"RandomID": [i]}, geometry=[box(i, 0, i + 1, 1)], crs="EPSG:4269"
+        ).to_file(county_path(county) / f"{county.name}_orgunits.shp")
+
+    with caplog.at_level(logging.WARNING, logger="wakethevote.logger"):
+        county_org_units = export.read_counties(COUNTIES, workers=4)
+    assert list(county_org_units) == COUNTIES[:3]
+    assert "Alamance" in caplog.text
+
+    export.export_counties(COUNTIES, workers=4)
+    nc = gpd.read_file(tmp_path / "NC" / "NC_shapes.json")
+    ga = gpd.read_file(tmp_path / "GA" / "GA_shapes.json")
+    assert list(nc.RandomID) == [0, 2]
+    assert list(ga.RandomID) == [1]
@@ -0,0 +1,83 @@
+import sqlite3
+
+import fiona
+import pytest
+import geopandas as gpd
+from shapely.geometry import box
+
+from wakethevote.geopackage import replace_counties
+
+
+def org_units(*boxes):
+    return gpd.GeoDataFrame(
+        {"RandomID": range(1, len(boxes) + 1), "BlackHH": [60] * len(boxes)},
+        geometry=[box(*bounds) for bounds in boxes],
+        crs="EPSG:4269",
+    )
+
+
+def read_layer(path, layer):
+    with fiona.open(path, layer=layer) as collection:
+        return [feature["properties"]["CountyFIPS"] for feature in collection]
+
+
+def test_replace_counties(tmp_path):
+    path = tmp_path / "org_units.gpkg"
+    replace_counties(
+        path,
+        "NC",
+        {"37183": org_units((0, 0, 1, 1), (1, 0, 2, 1)), "37063": org_units((5, 5, 6, 6))},
+    )
+    assert sorted(read_layer(path, "NC")) == ["37063", "37183", "37183"]
+
+    # Replacing a county swaps its rows and keeps the spatial index in step
+    replace_counties(path, "NC", {"37183": org_units((10, 10, 11, 11))})
+    assert sorted(read_layer(path, "NC")) == ["37063", "37183"]
+
+    with sqlite3.connect(str(path)) as connection:
+        (indexed,) = connection.execute("SELECT COUNT(*) FROM rtree_NC_geom").fetchone()
+        (max_x,) = connection.execute(
+            "SELECT max_x FROM gpkg_contents WHERE table_name = 'NC'"
+        ).fetchone()
+    assert indexed == 2
+    assert max_x == 11
+
+    with fiona.open(path, layer="NC") as collection:
+        assert len(list(collection.filter(bbox=(9, 9, 12, 12)))) == 1
+
+    # Other layers are added to the same file
+    replace_counties(path, "GA", {"13177": org_units((0, 0, 1, 1))})
+    assert set(fiona.listlayers(str(path))) == {"NC", "GA"}
+
+
+def test_failed_write_leaves_layer_unchanged(tmp_path, monkeypatch):
+    path = tmp_path / "org_units.gpkg"
+
+    def fail(geometry, srs_id):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr("wakethevote.geopackage._to_gpkg_geometry", fail)
+    with pytest.raises(RuntimeError):
+        replace_counties(
+            path,
+            "NC",
+            {"37183": org_units((0, 0, 1, 1)), "37063": org_units((5, 5, 6, 6))},
+        )
+
+    # The new layer exists but none of the counties were half written
+    assert read_layer(path, "NC") == []
+
+
+def test_mismatched_columns_are_refused(tmp_path):
+    path = tmp_path / "org_units.gpkg"
+    replace_counties(path, "NC", {"37183": org_units((0, 0, 1, 1))})
+
+    renamed = org_units((5, 5, 6, 6)).rename(columns={"BlackHH": "Black_HH"})
+    with pytest.raises(ValueError, match="Black_HH"):
+        replace_counties(
+            path, "NC", {"37183": org_units((1, 0, 2, 1)), "37063": renamed}
+        )
+
+    # Neither county was written, so Wake keeps its original row
+    assert read_layer(path, "NC") == ["37183"]
+    assert gpd.read_file(path, layer="NC").total_bounds.tolist() == [0, 0, 1, 1]
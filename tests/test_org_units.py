@@ -0,0 +1,66 @@
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from shapely.geometry import box
+
+from wakethevote.org_units import get_org_units, join_counties
+
+
+def county_blocks():
+    """
+    Two rows of blocks: the bottom row crosses from county 37063 into 37183,
+    the top row (separated by a gap) is all in 37183
+    """
+    rows = []
+    for i in range(20):
+        x, y = i % 10, (i // 10) * 2
+        county = "063" if x < 3 and y == 0 else "183"
+        block_id = f"37{county}{i:010}"
+        rows.append(
+            dict(
+                BLOCKID10=block_id,
+                GEOID10=block_id,
+                PctBlack=80.0,
+                PctBlack18=80.0,
+                BlackHH=60 if i == 19 else 20,
+                HOUSING10=30,
+                P003001=100,
+                P003003=80,
+                P010001=70,
+                P010004=50,
+                precinct_abbrv="",
+                Total=0,
+                MECE1=0,
+                MECE2=0,
+                MECE3=0,
+                MECE4=0,
+                MECE5=0,
+                res_city_desc="",
+                geometry=box(x, y, x + 1, y + 1),
+            )
+        )
+    return gpd.GeoDataFrame(rows, crs="EPSG:4269")
+
+
+def test_join_counties():
+    blocks = pd.DataFrame(
+        {"ClusterID": [0, 0, 0, 1], "Counties": ["37183", "37063", "37183", "37001"]}
+    )
+    counties = join_counties(blocks, "ClusterID")
+    assert counties.to_dict() == {0: "37063,37183", 1: "37001"}
+
+
+def test_org_units_tagged_with_counties():
+    np.random.seed(0)
+    org_units = get_org_units(county_blocks())
+    assert "37063,37183" in set(org_units.Counties)
+    assert set(org_units[org_units.OrgType == "block"].Counties) == {"37183"}
+
+
+def test_parallel_matches_serial():
+    def units(workers):
+        np.random.seed(0)
+        org_units = get_org_units(county_blocks(), workers)
+        return sorted(zip(org_units.BlackHH, org_units.Counties, org_units.OrgType))
+
+    assert units(2) == units(1)
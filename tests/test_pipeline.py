@@ -0,0 +1,63 @@
+import geopandas as gpd
+from shapely.geometry import box
+
+from wakethevote import Pipeline, download, export
+from wakethevote.types import County
+
+WAKE = County("37183", "Wake", "NC")
+
+
+def test_org_units_are_reused(monkeypatch):
+    calls = []
+
+    def fake_get_org_units(blocks, workers):
+        calls.append(workers)
+        return gpd.GeoDataFrame(
+            {"BlackHH": [60]}, geometry=[box(0, 0, 1, 1)], crs="EPSG:4269"
+        )
+
+    monkeypatch.setattr("wakethevote.pipeline.get_org_units", fake_get_org_units)
+    monkeypatch.setattr(
+        "wakethevote.pipeline.load_census_block_data", lambda county, chunk_size: None
+    )
+
+    pipeline = Pipeline(workers=2)
+    assert pipeline.org_units(WAKE).BlackHH.sum() == 60
+    pipeline.preview(WAKE)
+    assert calls == [2]
+
+    pipeline.clear([WAKE])
+    pipeline.org_units(WAKE)
+    assert calls == [2, 2]
+
+
+def test_export_matches_saved_schema(monkeypatch, tmp_path):
+    org_units = gpd.GeoDataFrame(
+        {
+            "RandomID": [1],
+            "BlackHH": [60],
+            "Total_census_population": [100],
+            "Total_census_Black_population": [80],
+            "square_miles": [0.5],
+        },
+        geometry=[box(0, 0, 1, 1)],
+        crs="EPSG:4269",
+    )
+    monkeypatch.setattr("wakethevote.pipeline.get_org_units", lambda b, w: org_units)
+    monkeypatch.setattr(
+        "wakethevote.pipeline.load_census_block_data", lambda county, chunk_size: None
+    )
+    monkeypatch.setattr(download, "get_county_data_path", lambda county: tmp_path)
+    monkeypatch.setattr(export, "STATES_DATA_PATH", tmp_path)
+    (tmp_path / "NC").mkdir()
+
+    # What --export writes: the org units read back from the saved shapefile
+    download.save_org_units(WAKE, org_units)
+    export.write_geojson({WAKE: gpd.read_file(tmp_path / "Wake_orgunits.shp")})
+    saved = gpd.read_file(tmp_path / "NC" / "NC_shapes.json")
+
+    Pipeline().export([WAKE])
+    exported = gpd.read_file(tmp_path / "NC" / "NC_shapes.json")
+
+    assert list(exported.columns) == list(saved.columns)
+    assert "Total_ce_1" in exported.columns
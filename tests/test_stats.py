@@ -0,0 +1,115 @@
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from shapely.geometry import box
+
+from wakethevote.org_units import get_org_units
+from wakethevote.stats import (
+    count_org_units,
+    get_block_adjacency,
+    get_stats,
+    summarize_states,
+)
+
+from .test_org_units import county_blocks
+
+
+def blocks_and_adjacency(black_hh):
+    """A row of blocks, each adjacent to the next"""
+    ids = [f"37183{i:010}" for i in range(len(black_hh))]
+    blocks = pd.DataFrame(
+        {
+            "BLOCKID10": ids,
+            "GEOID10": ids,
+            "PctBlack": 75.0,
+            "BlackHH": black_hh,
+            "P003001": 10,
+            "P003003": 8,
+        }
+    )
+    adjacency = pd.DataFrame({"block": ids[:-1], "neighbor": ids[1:]})
+    return blocks, adjacency
+
+
+def test_count_org_units_single_blocks():
+    blocks, adjacency = blocks_and_adjacency([60, 70])
+    org_units = count_org_units(blocks, adjacency)
+    assert list(org_units.OrgType) == ["block", "block"]
+    assert org_units.BlackHH.sum() == 130
+
+
+def test_count_org_units_aggregates():
+    # 30 + 30 is a single aggregate; the isolated 10 is too small to keep
+    blocks, adjacency = blocks_and_adjacency([30, 30, 60, 10])
+    adjacency = adjacency.iloc[:1]
+    org_units = count_org_units(blocks, adjacency)
+    assert sorted(org_units.OrgType) == ["block", "block aggregate"]
+    assert sorted(org_units.BlackHH) == [60, 60]
+
+
+def test_count_org_units_splits_large_clusters():
+    # 200 BHH in a chain: the first aggregate grows from one end until it
+    # passes 100 (3 blocks), the rest (2 blocks) make a second one
+    blocks, adjacency = blocks_and_adjacency([40] * 5)
+    org_units = count_org_units(blocks, adjacency)
+    assert sorted(org_units.BlackHH) == [80, 120]
+    assert org_units.P003001.sum() == 50
+
+
+def test_summarize_states():
+    stats = pd.DataFrame(
+        {
+            "fips": ["37183", "37063", "13177"],
+            "name": ["Wake", "Durham", "Lee"],
+            "state": ["NC", "NC", "GA"],
+            "org_units": [3, 2, 1],
+            "BlackHH": [300, 200, 50],
+            "Total_census_population": [900, 600, 150],
+            "Total_census_Black_population": [800, 500, 120],
+            "County_BlackHH": [600, 400, 100],
+            "Pct_BlackHH_covered": [50.0, 50.0, 50.0],
+        }
+    )
+    totals = summarize_states(stats)
+    assert list(totals.state) == ["NC", "GA"]
+    assert list(totals.fips) == ["37", "13"]
+    assert list(totals.org_units) == [5, 1]
+    assert list(totals.Pct_BlackHH_covered) == [50.0, 50.0]
+
+
+def test_get_stats_empty():
+    assert list(get_stats([]).columns)[:3] == ["fips", "name", "state"]
+
+
+def test_get_block_adjacency():
+    ids = [f"37183{i:010}" for i in range(4)]
+    blocks = gpd.GeoDataFrame(
+        {
+            "BLOCKID10": ids,
+            "GEOID10": ids,
+            "PctBlack": [75.0, 75.0, 75.0, 20.0],
+            "BlackHH": [20, 20, 20, 20],
+        },
+        # 0 and 1 share an edge, 2 only meets 1 at a corner, 3 isn't majority black
+        geometry=[box(0, 0, 1, 1), box(1, 0, 2, 1), box(2, 1, 3, 2), box(0, 1, 1, 2)],
+        crs="EPSG:4269",
+    )
+    adjacency = get_block_adjacency(blocks)
+    assert sorted(adjacency.itertuples(index=False, name=None)) == [
+        (ids[0], ids[1]),
+        (ids[1], ids[0]),
+    ]
+
+
+def test_count_org_units_matches_get_org_units():
+    blocks = county_blocks()
+    estimate = count_org_units(
+        pd.DataFrame(blocks.drop(columns="geometry")), get_block_adjacency(blocks)
+    )
+    np.random.seed(0)
+    org_units = get_org_units(blocks)
+
+    # Block IDs increase from west to east here, so both start each aggregate
+    # from the same block and should agree exactly
+    assert len(estimate) == len(org_units)
+    assert estimate.BlackHH.sum() == org_units.BlackHH.sum()